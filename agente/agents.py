@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import duckdb_local
+
 # Configuração do Google Gemini
 MODEL = genai.GenerativeModel('gemini-2.0-flash')
 GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -54,7 +56,7 @@ def main(pergunta_usuario, falg_tabela, sql):
     elif falg_tabela == "vale-alimentacao":
 
         sql_gerado = gerar_sql_agent_conta_corrente(pergunta_usuario, contexto_tabela_vale_alimentacao)
-        dados_recuperados = processar_sql_bd(sql_gerado)
+        dados_recuperados = processar_sql_bd(sql_gerado, sql)
         grafico_gerado = gerar_grafico_agent_visualizacao(dados_recuperados)
         analise_gerada = gerar_anase_agent_negocios(dados_recuperados, contexto_tabela_vale_alimentacao, pergunta_usuario)
     
@@ -108,6 +110,13 @@ def gerar_sql_agent_conta_corrente(pergunta_usuario, contexto_tabela):
 def processar_sql_bd(resposta_sql, sql):
     print("Executando: Processamento do SQL")
 
+    # Consulta primeiro a réplica local (DuckDB); o SQL Warehouse fica como fallback
+    if duckdb_local.disponivel():
+        try:
+            return duckdb_local.executar_sql(resposta_sql)
+        except Exception as e:
+            print(f"⚠️ Falha no motor local, usando o SQL Warehouse: {e}")
+
     DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN")
     HTTPS_PATH = os.getenv("HTTP_PATH")
     SERVER_HOSTNAME = os.getenv("SERVER_HOSTNAME")
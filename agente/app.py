@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from databricks import sql
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
@@ -40,6 +40,10 @@ class Conversation(BaseModel):
     id: int
     title: str
     created_at: str
+    message_count: int = 0
+    last_activity: Optional[str] = None
+    last_tipo_conta: Optional[str] = None
+    preview: Optional[str] = None
 
 class Message(BaseModel):
     id: int
@@ -59,14 +63,11 @@ def ask_question(request: PerguntaRequest):  # ← Removido o parâmetro "sql"
     try:
         conversation_id = request.conversation_id
         
-        # Create new conversation if not provided
+        # Create new conversation (titled after the question) along with the user message
         if not conversation_id:
-            # Use the first few words of the question as the title
-            title = " ".join(request.pergunta.split()[:5])
-            conversation_id = database.create_conversation(title)
-        
-        # Save user message
-        database.add_message(conversation_id, "user", request.pergunta)
+            conversation_id = database.start_conversation(request.pergunta, request.tipo_conta)
+        else:
+            database.add_message(conversation_id, "user", request.pergunta, tipo_conta=request.tipo_conta)
 
         # O módulo sql já está importado no topo do arquivo
         # Agora passe-o para agents.main()
@@ -80,7 +81,7 @@ def ask_question(request: PerguntaRequest):  # ← Removido o parâmetro "sql"
         grafico_para_retorno = grafico if grafico is not None else {}
         
         # Save AI response
-        database.add_message(conversation_id, "ai", texto, grafico_para_retorno)
+        database.add_message(conversation_id, "ai", texto, grafico_para_retorno, request.tipo_conta)
 
         return {
             "sql_gerado": sql_gerado,  # ← Renomeei para evitar confusão com o módulo
@@ -101,13 +102,22 @@ def ask_question(request: PerguntaRequest):  # ← Removido o parâmetro "sql"
     
 
 @app.get("/conversations", response_model=List[Conversation])
-def get_conversations():
+def get_conversations(request: Request, response: Response):
+    # The version is read before the list, so a concurrent write can only make the ETag older than the data
+    etag = f'W/"{database.get_sidebar_version()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
     return database.get_conversations()
 
 @app.post("/conversations", response_model=Conversation)
 def create_conversation():
-    id = database.create_conversation("Nova Conversa")
-    conversations = database.get_conversations()
+    conversation_id = database.create_conversation("Nova Conversa")
+    return database.get_conversation(conversation_id)
 
 
 @app.patch("/conversations/{conversation_id}")
@@ -4,6 +4,8 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 DB_NAME = "chat_history.db"
+PREVIEW_LENGTH = 80
+TITLE_WORDS = 5
 
 def init_db():
     """Initializes the database with the necessary tables."""
@@ -40,9 +42,107 @@ def init_db():
         )
     ''')
     
+    # Check if tipo_conta column exists (for existing databases)
+    cursor.execute("PRAGMA table_info(messages)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if "tipo_conta" not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN tipo_conta TEXT")
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, created_at)')
+    
+    # Summary index for the sidebar, kept up to date by the triggers below
+    # so listing conversations never reads the messages table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conversation_id INTEGER PRIMARY KEY,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            last_activity TIMESTAMP,
+            last_tipo_conta TEXT,
+            preview TEXT,
+            FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+        )
+    ''')
+    
+    # Single-row counter bumped on every sidebar change; together with a random
+    # epoch generated when the row is created, it is used as the ETag
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sidebar_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            epoch TEXT
+        )
+    ''')
+    
+    # Check if epoch column exists (for existing databases)
+    cursor.execute("PRAGMA table_info(sidebar_version)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if "epoch" not in columns:
+        cursor.execute("ALTER TABLE sidebar_version ADD COLUMN epoch TEXT")
+    
+    cursor.execute('INSERT OR IGNORE INTO sidebar_version (id, version, epoch) VALUES (1, 0, lower(hex(randomblob(8))))')
+    cursor.execute('UPDATE sidebar_version SET epoch = lower(hex(randomblob(8))) WHERE id = 1 AND epoch IS NULL')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_conversations_insert
+        AFTER INSERT ON conversations
+        BEGIN
+            INSERT OR IGNORE INTO conversation_summaries (conversation_id, last_activity)
+            VALUES (NEW.id, NEW.created_at);
+            UPDATE sidebar_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_conversations_update
+        AFTER UPDATE ON conversations
+        BEGIN
+            UPDATE sidebar_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_messages_insert
+        AFTER INSERT ON messages
+        BEGIN
+            INSERT OR IGNORE INTO conversation_summaries (conversation_id)
+            VALUES (NEW.conversation_id);
+            UPDATE conversation_summaries SET
+                message_count = message_count + 1,
+                last_activity = NEW.created_at,
+                last_tipo_conta = COALESCE(NEW.tipo_conta, last_tipo_conta),
+                preview = substr(NEW.content, 1, {PREVIEW_LENGTH})
+            WHERE conversation_id = NEW.conversation_id;
+            UPDATE sidebar_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+    
+    # Backfill summaries for conversations created before the index existed
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO conversation_summaries
+            (conversation_id, message_count, last_activity, last_tipo_conta, preview)
+        SELECT
+            c.id,
+            (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = c.id),
+            COALESCE(
+                (SELECT MAX(m.created_at) FROM messages m WHERE m.conversation_id = c.id),
+                c.created_at
+            ),
+            (SELECT m.tipo_conta FROM messages m
+             WHERE m.conversation_id = c.id AND m.tipo_conta IS NOT NULL
+             ORDER BY m.created_at DESC, m.id DESC LIMIT 1),
+            (SELECT substr(m.content, 1, {PREVIEW_LENGTH}) FROM messages m
+             WHERE m.conversation_id = c.id
+             ORDER BY m.created_at DESC, m.id DESC LIMIT 1)
+        FROM conversations c
+    ''')
+    
     conn.commit()
     conn.close()
 
+def make_title(question: str) -> str:
+    """Builds a conversation title from the first words of the question."""
+    return " ".join(question.split()[:TITLE_WORDS]) or "Nova Conversa"
+
 def create_conversation(title: str = "Nova Conversa") -> int:
     """Creates a new conversation and returns its ID."""
     conn = sqlite3.connect(DB_NAME)
@@ -55,7 +155,24 @@ def create_conversation(title: str = "Nova Conversa") -> int:
     conn.close()
     return conversation_id
 
-def add_message(conversation_id: int, sender: str, content: str, chart_data: Optional[Dict[str, Any]] = None):
+def start_conversation(question: str, tipo_conta: Optional[str] = None) -> int:
+    """Creates a conversation with the question as its first message and returns its ID."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    
+    cursor.execute('INSERT INTO conversations (title) VALUES (?)', (make_title(question),))
+    conversation_id = cursor.lastrowid
+    
+    cursor.execute('''
+        INSERT INTO messages (conversation_id, sender, content, tipo_conta)
+        VALUES (?, ?, ?, ?)
+    ''', (conversation_id, "user", question, tipo_conta))
+    
+    conn.commit()
+    conn.close()
+    return conversation_id
+
+def add_message(conversation_id: int, sender: str, content: str, chart_data: Optional[Dict[str, Any]] = None, tipo_conta: Optional[str] = None):
     """Adds a message to a conversation."""
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
@@ -63,20 +180,58 @@ def add_message(conversation_id: int, sender: str, content: str, chart_data: Opt
     chart_json = json.dumps(chart_data) if chart_data else None
     
     cursor.execute('''
-        INSERT INTO messages (conversation_id, sender, content, chart_data)
-        VALUES (?, ?, ?, ?)
-    ''', (conversation_id, sender, content, chart_json))
+        INSERT INTO messages (conversation_id, sender, content, chart_data, tipo_conta)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (conversation_id, sender, content, chart_json, tipo_conta))
     
     conn.commit()
     conn.close()
 
+def get_conversation(conversation_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieves a single conversation with its summary."""
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT c.id, c.title, c.created_at,
+               COALESCE(s.message_count, 0) AS message_count,
+               COALESCE(s.last_activity, c.created_at) AS last_activity,
+               s.last_tipo_conta, s.preview
+        FROM conversations c
+        LEFT JOIN conversation_summaries s ON s.conversation_id = c.id
+        WHERE c.id = ?
+    ''', (conversation_id,))
+    row = cursor.fetchone()
+    
+    conn.close()
+    return dict(row) if row else None
+
+def get_sidebar_version() -> str:
+    """Returns the database epoch and the counter bumped on every change visible in the sidebar."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute('SELECT epoch, version FROM sidebar_version WHERE id = 1')
+    row = cursor.fetchone()
+    conn.close()
+    return f"{row[0]}-{row[1]}" if row else "0"
+
 def get_conversations() -> List[Dict[str, Any]]:
-    """Retrieves all active conversations ordered by creation date (descending)."""
+    """Retrieves all active conversations with their summaries ordered by creation date (descending)."""
     conn = sqlite3.connect(DB_NAME)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    cursor.execute('SELECT * FROM conversations WHERE is_deleted = 0 ORDER BY created_at DESC')
+    cursor.execute('''
+        SELECT c.id, c.title, c.created_at,
+               COALESCE(s.message_count, 0) AS message_count,
+               COALESCE(s.last_activity, c.created_at) AS last_activity,
+               s.last_tipo_conta, s.preview
+        FROM conversations c
+        LEFT JOIN conversation_summaries s ON s.conversation_id = c.id
+        WHERE c.is_deleted = 0
+        ORDER BY c.created_at DESC
+    ''')
     rows = cursor.fetchall()
     
     conversations = []
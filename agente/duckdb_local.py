@@ -0,0 +1,284 @@
+import os
+import re
+import threading
+import time
+from databricks.sql.types import Row
+
+# Motor local (DuckDB) sobre os snapshots Parquet gerados por
+# ingestao_local/exportar_parquet.py. Ativado com LOCAL_QUERY_ENGINE=duckdb;
+# o SQL Warehouse do Databricks continua sendo usado como fallback.
+# As variáveis de ambiente são lidas a cada chamada, depois do load_dotenv().
+
+# Mesmo diretório padrão do exportador, independente de onde cada processo é iniciado
+DIRETORIO_PARQUET_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dados_locais")
+
+# Idade máxima (em horas) dos snapshots antes de voltar a consultar o SQL Warehouse
+IDADE_MAXIMA_PADRAO_HORAS = 24
+
+# Nome da view local -> nomes pelos quais a tabela aparece no SQL gerado
+TABELAS_LOCAIS = {
+    "prata_cc": [
+        "workspace.db_work_databricks.prata_cc",
+        "db_work_databricks.prata_cc",
+    ],
+    "view_vale_alimentacao": [
+        "workspace.db_work_databricks.view_vale_alimentacao",
+        "db_work_databricks.view_vale_alimentacao",
+    ],
+}
+
+# Padrões de data do Spark (Java) -> strftime do DuckDB, do mais longo para o mais curto
+PADROES_DATA = [
+    ("yyyy", "%Y"), ("yy", "%y"),
+    ("MMMM", "%B"), ("MMM", "%b"), ("MM", "%m"), ("M", "%-m"),
+    ("dd", "%d"), ("d", "%-d"),
+    ("EEEE", "%A"), ("EEE", "%a"), ("E", "%a"),
+    ("HH", "%H"), ("hh", "%I"), ("mm", "%M"), ("ss", "%S"), ("a", "%p"),
+]
+
+_conexao = None
+_diretorio_conexao = None
+_lock = threading.Lock()
+
+
+def motor_local_ativo():
+    """
+    Indica se o motor local foi habilitado com LOCAL_QUERY_ENGINE=duckdb
+    """
+    return os.getenv("LOCAL_QUERY_ENGINE", "").lower() == "duckdb"
+
+
+def diretorio_parquet():
+    """
+    Diretório dos snapshots (LOCAL_PARQUET_DIR ou dados_locais/ na raiz do repositório)
+    """
+    return os.getenv("LOCAL_PARQUET_DIR") or DIRETORIO_PARQUET_PADRAO
+
+
+def caminho_parquet(tabela):
+    """
+    Caminho do snapshot Parquet de uma tabela local
+    """
+    return os.path.join(diretorio_parquet(), f"{tabela}.parquet")
+
+
+def _idade_maxima_segundos():
+    """
+    Idade máxima dos snapshots em segundos; valores vazios ou inválidos em
+    LOCAL_PARQUET_MAX_AGE_HOURS usam o padrão
+    """
+    valor = os.getenv("LOCAL_PARQUET_MAX_AGE_HOURS", "").strip()
+    try:
+        horas = float(valor) if valor else IDADE_MAXIMA_PADRAO_HORAS
+    except ValueError:
+        print(f"⚠️ LOCAL_PARQUET_MAX_AGE_HOURS inválido ({valor!r}), usando {IDADE_MAXIMA_PADRAO_HORAS}h")
+        horas = IDADE_MAXIMA_PADRAO_HORAS
+    return horas * 3600
+
+
+def disponivel():
+    """
+    Indica se o motor local está habilitado e se todos os snapshots existem e
+    estão dentro da idade máxima (LOCAL_PARQUET_MAX_AGE_HOURS)
+    """
+    if not motor_local_ativo():
+        return False
+
+    idade_maxima = _idade_maxima_segundos()
+    agora = time.time()
+
+    for tabela in TABELAS_LOCAIS:
+        caminho = caminho_parquet(tabela)
+        if not os.path.exists(caminho):
+            return False
+        if agora - os.path.getmtime(caminho) > idade_maxima:
+            print(f"⚠️ Snapshot desatualizado ({caminho}), usando o SQL Warehouse")
+            return False
+    return True
+
+
+def _get_conexao():
+    """
+    Abre a conexão DuckDB em processo e registra uma view por snapshot. A conexão
+    é recriada se LOCAL_PARQUET_DIR mudar, para consultar o mesmo diretório
+    verificado em disponivel()
+    """
+    global _conexao, _diretorio_conexao
+    with _lock:
+        diretorio = diretorio_parquet()
+        if _conexao is None or _diretorio_conexao != diretorio:
+            import duckdb
+
+            conexao = duckdb.connect(database=":memory:")
+            for tabela in TABELAS_LOCAIS:
+                caminho = caminho_parquet(tabela).replace("'", "''")
+                conexao.execute(
+                    f"CREATE OR REPLACE VIEW {tabela} AS SELECT * FROM read_parquet('{caminho}')"
+                )
+            _conexao = conexao
+            _diretorio_conexao = diretorio
+        return _conexao
+
+
+def _converter_padrao_data(padrao):
+    """
+    Converte um padrão de data do Spark (Java), ex.: 'yyyy-MM', para strftime ('%Y-%m')
+    """
+    resultado = []
+    i = 0
+    while i < len(padrao):
+        # Texto entre aspas simples é literal no padrão Java
+        if padrao[i] == "'":
+            fim = padrao.find("'", i + 1)
+            fim = len(padrao) if fim == -1 else fim
+            resultado.append(padrao[i + 1:fim].replace("%", "%%"))
+            i = fim + 1
+            continue
+
+        for java, strftime in PADROES_DATA:
+            if padrao.startswith(java, i):
+                resultado.append(strftime)
+                i += len(java)
+                break
+        else:
+            resultado.append("%%" if padrao[i] == "%" else padrao[i])
+            i += 1
+    return "".join(resultado)
+
+
+def _normalizar_literais(sql):
+    """
+    Ajusta as aspas: no Spark SQL "texto" é um literal e `coluna` é um
+    identificador, enquanto no DuckDB são 'texto' e "coluna"
+    """
+    resultado = []
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if char == "'":
+            fim = i + 1
+            while fim < len(sql):
+                if sql[fim] == "\\":
+                    fim += 2
+                    continue
+                if sql[fim] == "'":
+                    break
+                fim += 1
+            resultado.append(sql[i:fim + 1])
+            i = fim + 1
+        elif char == '"':
+            fim = sql.find('"', i + 1)
+            fim = len(sql) if fim == -1 else fim
+            conteudo = sql[i + 1:fim].replace("'", "''")
+            resultado.append(f"'{conteudo}'")
+            i = fim + 1
+        elif char == "`":
+            fim = sql.find("`", i + 1)
+            fim = len(sql) if fim == -1 else fim
+            resultado.append(f'"{sql[i + 1:fim]}"')
+            i = fim + 1
+        else:
+            resultado.append(char)
+            i += 1
+    return "".join(resultado)
+
+
+def _separar_argumentos(sql, inicio):
+    """
+    Separa os argumentos de uma chamada de função cujo parêntese de abertura
+    está em `inicio`. Retorna os argumentos e a posição após o fechamento.
+    """
+    argumentos = []
+    profundidade = 0
+    atual = inicio + 1
+    i = inicio + 1
+    em_literal = False
+    while i < len(sql):
+        char = sql[i]
+        if char == "'":
+            em_literal = not em_literal
+        elif not em_literal:
+            if char == "(":
+                profundidade += 1
+            elif char == ")":
+                if profundidade == 0:
+                    argumentos.append(sql[atual:i].strip())
+                    return argumentos, i + 1
+                profundidade -= 1
+            elif char == "," and profundidade == 0:
+                argumentos.append(sql[atual:i].strip())
+                atual = i + 1
+        i += 1
+    raise ValueError("Parênteses desbalanceados no SQL gerado")
+
+
+def _traduzir_funcao(sql, nome, traducao):
+    """
+    Substitui cada chamada `nome(...)` por `traducao(argumentos)`
+    """
+    padrao = re.compile(rf"\b{nome}\s*\(", re.IGNORECASE)
+    resultado = []
+    posicao = 0
+    while True:
+        match = padrao.search(sql, posicao)
+        if not match:
+            break
+        # Traduz chamadas aninhadas nos argumentos antes da chamada externa
+        argumentos, fim = _separar_argumentos(sql, match.end() - 1)
+        argumentos = [_traduzir_funcao(arg, nome, traducao) for arg in argumentos]
+        resultado.append(sql[posicao:match.start()])
+        resultado.append(traducao(argumentos))
+        posicao = fim
+    resultado.append(sql[posicao:])
+    return "".join(resultado)
+
+
+def _date_format(argumentos):
+    expressao, padrao = argumentos
+    if padrao.startswith("'") and padrao.endswith("'"):
+        padrao = "'" + _converter_padrao_data(padrao[1:-1]) + "'"
+    return f"strftime(CAST({expressao} AS TIMESTAMP), {padrao})"
+
+
+def traduzir_sql(sql_spark):
+    """
+    Traduz o Spark SQL gerado pelo agente para o dialeto do DuckDB
+    """
+    sql = _normalizar_literais(sql_spark.strip().rstrip(";"))
+
+    # Tabelas do Unity Catalog -> views locais sobre os snapshots Parquet
+    for tabela, nomes in TABELAS_LOCAIS.items():
+        for nome in nomes:
+            sql = re.sub(rf"\b{re.escape(nome)}\b", tabela, sql, flags=re.IGNORECASE)
+
+    sql = _traduzir_funcao(sql, "DATE_FORMAT", _date_format)
+    sql = _traduzir_funcao(
+        sql, "DATE_ADD", lambda a: f"CAST(CAST({a[0]} AS DATE) + INTERVAL ({a[1]}) DAY AS DATE)"
+    )
+    sql = _traduzir_funcao(
+        sql, "DATE_SUB", lambda a: f"CAST(CAST({a[0]} AS DATE) - INTERVAL ({a[1]}) DAY AS DATE)"
+    )
+    sql = _traduzir_funcao(
+        sql, "ADD_MONTHS", lambda a: f"CAST(CAST({a[0]} AS DATE) + INTERVAL ({a[1]}) MONTH AS DATE)"
+    )
+    sql = re.sub(r"\bCURRENT_DATE\s*\(\s*\)", "current_date", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bCURRENT_TIMESTAMP\s*\(\s*\)", "current_timestamp", sql, flags=re.IGNORECASE)
+    return sql
+
+
+def executar_sql(sql_spark):
+    """
+    Executa o SQL gerado sobre os snapshots locais. As linhas são retornadas como
+    Row do conector Databricks, mantendo os nomes das colunas (ex.: sum(valor))
+    """
+    sql_local = traduzir_sql(sql_spark)
+    print(f"🦆 SQL Local (DuckDB):\n{sql_local}\n")
+
+    cursor = _get_conexao().cursor()
+    try:
+        cursor.execute(sql_local)
+        colunas = [descricao[0] for descricao in cursor.description]
+        criar_linha = Row(*colunas)
+        return [criar_linha(*linha) for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
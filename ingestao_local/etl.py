@@ -3,6 +3,8 @@ import numpy as np
 import json
 import re
 import os
+import math
+import zipfile
 import requests
 import argparse
 from datetime import datetime
@@ -17,62 +19,216 @@ DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN")  # coloque seu token no .env
 JOB_ID = os.getenv("DATABRICKS_ID_JOB")
 PATH_EXCEL = os.getenv("PATH_EXCEL")
 
-def processar_arquivo_excel(caminho_arquivo):
+# Cabeçalhos do extrato. As colunas brutas são lidas como object em todos os
+# blocos (sem inferência por bloco) e convertidas para os tipos finais,
+# declarados em DTYPES_EXTRATO_LIMPO, na etapa de limpeza (limpar_dados)
+COLUNAS_EXTRATO = ['data', 'descricao', 'documento', 'valor', 'saldo']
+DTYPES_EXTRATO = {coluna: 'object' for coluna in COLUNAS_EXTRATO}
+DTYPES_EXTRATO_LIMPO = {
+    'data': 'datetime64[ns]',
+    'descricao': 'object',
+    'documento': 'object',
+    'valor': 'float64',
+    'saldo': 'float64',
+    'valor_original': 'float64',
+    'tipo_movimentacao': 'object',
+}
+
+LINHAS_CABECALHO = 10
+TERMINADOR_EXTRATO = "saldo da conta"
+TAMANHO_BLOCO = 500
+
+
+def _linha_vazia(linha):
+    """
+    Verifica se todos os valores da linha são vazios ou espaços em branco
+    """
+    return all(
+        pd.isna(valor) or (isinstance(valor, str) and valor.strip() == '')
+        for valor in linha
+    )
+
+
+def _linha_terminadora(linha):
+    """
+    Verifica se a linha contém o marcador "Saldo da Conta"
+    """
+    return any(str(valor).strip().lower() == TERMINADOR_EXTRATO for valor in linha)
+
+
+def _linhas_xlsx(caminho_arquivo):
     """
-    Processa um arquivo Excel (.xls/.xlsx) e retorna um DataFrame com os dados limpos
+    Itera as linhas da primeira planilha de um .xlsx em modo somente leitura (openpyxl)
     """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(caminho_arquivo, read_only=True, data_only=True)
     try:
-        # Lê o arquivo Excel ignorando as 10 primeiras linhas
-        df = pd.read_excel(caminho_arquivo, skiprows=10, header=None)
-        
-        # Encontra o índice onde está "Saldo da Conta" ou uma linha em branco
-        indice_final = None
-        
-        for idx, row in df.iterrows():
-            # Verifica se todos os valores da linha são NaN ou espaços em branco
-            is_linha_vazia = all(
-                pd.isna(valor) or (isinstance(valor, str) and valor.strip() == '')
-                for valor in row
-            )
-            
-            # Se encontrar "Saldo da Conta" ou linha vazia, para a leitura
-            if is_linha_vazia or any(str(valor).strip().lower() == "saldo da conta" for valor in row):
-                indice_final = idx
-                break
-        
-        # Se encontrou ponto de parada, corta o DataFrame
-        if indice_final is not None:
-            df = df.iloc[:indice_final]
-        
-        # Remove linhas com todos os valores NaN
-        df = df.dropna(how='all')
-        
-        # Remove linhas onde todos os valores são espaços em branco
-        df = df[~df.astype(str).apply(lambda x: x.str.strip().eq('').all(), axis=1)]
-        
-        # Adiciona os cabeçalhos específicos
-        novos_cabecalhos = ['data', 'descricao', 'documento', 'valor', 'saldo']
-        
-        # Verifica se o número de colunas corresponde ao número de cabeçalhos
-        if len(df.columns) == len(novos_cabecalhos):
-            df.columns = novos_cabecalhos
-        else:
-            print(f"Aviso: O número de colunas ({len(df.columns)}) não corresponde ao número de cabeçalhos ({len(novos_cabecalhos)})")
-            if len(df.columns) > len(novos_cabecalhos):
-                df.columns = novos_cabecalhos + [f'coluna_{i+1}' for i in range(len(df.columns) - len(novos_cabecalhos))]
-            else:
-                df.columns = novos_cabecalhos[:len(df.columns)]
-        
-        # Aplica as limpezas nos dados
-        df_limpo = limpar_dados(df)
-        
-        return df_limpo
+        planilha = workbook.worksheets[0]
+        for linha in planilha.iter_rows(min_row=LINHAS_CABECALHO + 1, values_only=True):
+            yield linha
+    finally:
+        workbook.close()
+
+
+def _linhas_xls(caminho_arquivo):
+    """
+    Itera as linhas da primeira planilha de um .xls (xlrd). O xlrd não lê em
+    streaming: a planilha inteira é carregada antes da primeira linha, então a
+    memória do .xls continua crescendo com o tamanho do arquivo. Os valores das
+    células seguem a mesma conversão do pd.read_excel (motor xlrd).
+    """
+    import xlrd
+
+    workbook = xlrd.open_workbook(caminho_arquivo, on_demand=True)
+    try:
+        planilha = workbook.sheet_by_index(0)
+        for idx in range(LINHAS_CABECALHO, planilha.nrows):
+            linha = []
+            for celula in planilha.row(idx):
+                if celula.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                    linha.append(None)
+                elif celula.ctype == xlrd.XL_CELL_DATE:
+                    linha.append(xlrd.xldate_as_datetime(celula.value, workbook.datemode))
+                elif celula.ctype == xlrd.XL_CELL_ERROR:
+                    linha.append(None)
+                elif celula.ctype == xlrd.XL_CELL_BOOLEAN:
+                    linha.append(bool(celula.value))
+                elif celula.ctype == xlrd.XL_CELL_NUMBER and math.isfinite(celula.value) and int(celula.value) == celula.value:
+                    # Números inteiros (ex.: documento) não viram float, como no pandas
+                    linha.append(int(celula.value))
+                else:
+                    linha.append(celula.value)
+            yield tuple(linha)
+    finally:
+        workbook.release_resources()
+
+
+def _linhas_pandas(caminho_arquivo):
+    """
+    Itera as linhas de formatos sem leitura em streaming (ex.: .ods) via pandas,
+    que carrega a planilha inteira
+    """
+    df = pd.read_excel(caminho_arquivo, skiprows=LINHAS_CABECALHO, header=None)
+    for linha in df.itertuples(index=False, name=None):
+        yield linha
+
+
+def _formato_arquivo(caminho_arquivo):
+    """
+    Identifica o formato pelo conteúdo do arquivo (e não pela extensão)
+    """
+    with open(caminho_arquivo, 'rb') as arquivo:
+        assinatura = arquivo.read(8)
+
+    # .xls (BIFF) fica dentro de um container OLE2
+    if assinatura.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return 'xls'
+
+    # .xlsx é um zip com xl/workbook.xml (.ods também é zip, mas sem esse arquivo)
+    if zipfile.is_zipfile(caminho_arquivo):
+        with zipfile.ZipFile(caminho_arquivo) as arquivo_zip:
+            if 'xl/workbook.xml' in arquivo_zip.namelist():
+                return 'xlsx'
+
+    return None
+
+
+def ler_linhas_extrato(caminho_arquivo):
+    """
+    Itera as linhas de dados do extrato, ignorando as 10 primeiras linhas e
+    parando em "Saldo da Conta" ou na primeira linha em branco
+    """
+    formato = _formato_arquivo(caminho_arquivo)
+    if formato == 'xls':
+        linhas = _linhas_xls(caminho_arquivo)
+    elif formato == 'xlsx':
+        linhas = _linhas_xlsx(caminho_arquivo)
+    else:
+        linhas = _linhas_pandas(caminho_arquivo)
+
+    for linha in linhas:
+        if _linha_vazia(linha) or _linha_terminadora(linha):
+            break
+        yield linha
+
+
+def ler_excel_em_blocos(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê o extrato em blocos de até `tamanho_bloco` linhas, retornando um DataFrame
+    por bloco com os cabeçalhos do extrato. Para .xlsx só o bloco corrente fica
+    em memória; .xls (ver _linhas_xls) e formatos lidos via pandas (ver
+    _linhas_pandas) carregam a planilha inteira antes de gerar os blocos.
+    """
+    largura_maxima = len(COLUNAS_EXTRATO)
+    bloco = []
+
+    for linha in ler_linhas_extrato(caminho_arquivo):
+        linha = list(linha)
+
+        # Remove as células vazias à direita além das colunas do extrato
+        # (planilhas costumam ter colunas de formatação); um saldo vazio é mantido
+        while len(linha) > len(COLUNAS_EXTRATO) and (linha[-1] is None or (isinstance(linha[-1], str) and linha[-1].strip() == '')):
+            linha.pop()
+
+        if len(linha) > largura_maxima:
+            largura_maxima = len(linha)
+            print(f"Aviso: O número de colunas ({largura_maxima}) não corresponde ao número de cabeçalhos ({len(COLUNAS_EXTRATO)})")
+
+        bloco.append(linha)
+
+        if len(bloco) >= tamanho_bloco:
+            yield _montar_bloco(bloco)
+            bloco = []
+
+    if bloco:
+        yield _montar_bloco(bloco)
+
+
+def _montar_bloco(linhas):
+    """
+    Monta o DataFrame de um bloco com os cabeçalhos e tipos do extrato,
+    completando as linhas mais curtas com valores vazios
+    """
+    largura = max(len(COLUNAS_EXTRATO), max(len(linha) for linha in linhas))
+    colunas = COLUNAS_EXTRATO + [f'coluna_{i+1}' for i in range(largura - len(COLUNAS_EXTRATO))]
+    linhas = [linha + [None] * (largura - len(linha)) for linha in linhas]
+
+    df = pd.DataFrame.from_records(linhas, columns=colunas)
+    return df.astype({coluna: DTYPES_EXTRATO.get(coluna, 'object') for coluna in colunas})
+
+
+def processar_excel_em_blocos(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO, data_processamento=None):
+    """
+    Itera os blocos do extrato já limpos, para quem consome o arquivo sem
+    precisar materializar todas as linhas
+    """
+    # Todos os blocos compartilham o mesmo timestamp de processamento
+    data_processamento = data_processamento or datetime.now()
+
+    for bloco in ler_excel_em_blocos(caminho_arquivo, tamanho_bloco):
+        yield limpar_dados(bloco, data_processamento)
+
+
+def processar_arquivo_excel(caminho_arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Processa um arquivo Excel (.xls/.xlsx) e retorna um DataFrame com os dados limpos.
+    O resultado completo é materializado, pois enviar_databricks envia um único payload.
+    """
+    try:
+        data_processamento = datetime.now()
+        blocos_limpos = list(processar_excel_em_blocos(caminho_arquivo, tamanho_bloco, data_processamento))
+
+        if not blocos_limpos:
+            return limpar_dados(pd.DataFrame(columns=COLUNAS_EXTRATO).astype(DTYPES_EXTRATO), data_processamento)
+
+        return pd.concat(blocos_limpos, ignore_index=True)
     
     except Exception as e:
         print(f"Erro ao processar o arquivo: {str(e)}")
         return None
 
-def limpar_dados(df):
+def limpar_dados(df, data_processamento=None):
     """
     Aplica todas as limpezas necessárias no DataFrame
     """
@@ -108,7 +264,10 @@ def limpar_dados(df):
         df['valor'] = df['valor'].abs()
         
         # Adiciona timestamp de processamento
-        df['data_processamento'] = datetime.now()
+        df['data_processamento'] = data_processamento or datetime.now()
+        
+        # Garante os mesmos tipos em todos os blocos
+        df = df.astype({coluna: tipo for coluna, tipo in DTYPES_EXTRATO_LIMPO.items() if coluna in df.columns})
         
         return df
         
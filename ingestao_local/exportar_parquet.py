@@ -0,0 +1,61 @@
+from databricks import sql
+import pyarrow.parquet as pq
+import os
+
+from dotenv import load_dotenv
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN")
+HTTPS_PATH = os.getenv("HTTP_PATH")
+SERVER_HOSTNAME = os.getenv("SERVER_HOSTNAME")
+# Mesmo diretório padrão do motor local (agente/duckdb_local.py): dados_locais/ na raiz do repositório
+DIRETORIO_PARQUET = os.getenv("LOCAL_PARQUET_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dados_locais"
+)
+
+# Tabelas da camada prata replicadas para o motor local (agente/duckdb_local.py)
+TABELAS_EXPORTADAS = {
+    "prata_cc": "workspace.db_work_databricks.prata_cc",
+    "view_vale_alimentacao": "workspace.db_work_databricks.view_vale_alimentacao",
+}
+
+def exportar_tabela(cursor, nome_local, nome_tabela):
+    """
+    Exporta um snapshot completo da tabela para <DIRETORIO_PARQUET>/<nome_local>.parquet
+    """
+    cursor.execute(f"SELECT * FROM {nome_tabela}")
+    tabela = cursor.fetchall_arrow()
+
+    caminho = os.path.join(DIRETORIO_PARQUET, f"{nome_local}.parquet")
+    caminho_temporario = f"{caminho}.tmp"
+
+    # Escreve em um arquivo temporário e troca de uma vez, para o agente
+    # nunca ler um snapshot pela metade
+    pq.write_table(tabela, caminho_temporario)
+    os.replace(caminho_temporario, caminho)
+
+    print(f"{nome_tabela}: {tabela.num_rows} linhas exportadas para {caminho}")
+
+def exportar_snapshots():
+    os.makedirs(DIRETORIO_PARQUET, exist_ok=True)
+
+    connection = sql.connect(
+                            server_hostname = SERVER_HOSTNAME,
+                            http_path = HTTPS_PATH,
+                            access_token = DATABRICKS_TOKEN)
+
+    cursor = connection.cursor()
+
+    try:
+        for nome_local, nome_tabela in TABELAS_EXPORTADAS.items():
+            exportar_tabela(cursor, nome_local, nome_tabela)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    print("Iniciando a exportação dos snapshots para Parquet...")
+    exportar_snapshots()